@@ -1,34 +1,72 @@
 #!/usr/bin/env python3
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 import json
-import base64
+import ijson
+import pybase64
+import binascii
+import mmap
 import os
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import random
-import time
 
 # Constants
 DEFAULT_MODEL_ID = "amazon.nova-reel-v1:0"
 
-def list_s3_buckets():
-    """List all available S3 buckets and return as array with ordinal and S3 filepath"""
+# Shared client config - the default pool of 10 connections gets churned by
+# the S3 polling loop + download, forcing repeated TLS handshakes
+BOTO_CONFIG = Config(
+    max_pool_connections=50,
+    tcp_keepalive=True,
+    retries={'mode': 'standard', 'max_attempts': 3}
+)
+
+# Download config - parallel byte-range GETs; a single S3 stream tops out
+# around 50 MB/s, which matters for the multi-MB Nova Reel outputs
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=8,
+    use_threads=True
+)
+
+# Shared session - caches the resolved credential chain (env -> config
+# -> instance metadata) so building clients doesn't repeat the lookups
+_SESSION = boto3.session.Session(region_name='us-east-1')
+
+# Cached boto3 clients - building a client on every call pays credential
+# resolution and TLS handshake costs, so create each one once and reuse it
+_BEDROCK_CLIENT = None
+_S3_CLIENT = None
+
+def get_bedrock_client():
+    """Return a shared bedrock-runtime client, creating it on first use"""
+    global _BEDROCK_CLIENT
+    if _BEDROCK_CLIENT is None:
+        _BEDROCK_CLIENT = _SESSION.client('bedrock-runtime', config=BOTO_CONFIG)
+    return _BEDROCK_CLIENT
+
+def get_s3_client():
+    """Return a shared S3 client, creating it on first use"""
+    global _S3_CLIENT
+    if _S3_CLIENT is None:
+        _S3_CLIENT = _SESSION.client('s3', config=BOTO_CONFIG)
+    return _S3_CLIENT
+
+def iter_s3_buckets():
+    """Yield (ordinal, s3_filepath) pairs for the available S3 buckets lazily,
+    so callers don't pay for a materialized list of dicts up front"""
     try:
-        s3_client = boto3.client('s3')
+        s3_client = get_s3_client()
         response = s3_client.list_buckets()
-        
-        bucket_list = []
+
         for index, bucket in enumerate(response['Buckets'], 1):
-            bucket_info = {
-                'ordinal': index,
-                's3_filepath': f"s3://{bucket['Name']}"
-            }
-            bucket_list.append(bucket_info)
-        
-        return bucket_list
+            yield index, f"s3://{bucket['Name']}"
     except Exception as e:
         print(f"Error listing S3 buckets: {str(e)}")
-        return []
 
 
 def get_garment_class():
@@ -53,42 +91,45 @@ def get_garment_class():
         print("Invalid choice. Please enter a number between 1-4.")
 
 def encode_image(image_path):
-    """Encode image file to base64"""
+    """Encode image file to base64 (returned as ASCII bytes)"""
     try:
         with open(image_path, 'rb') as f:
-            return base64.b64encode(f.read()).decode('utf-8')
+            # mmap the file so the encoder reads straight from the page cache
+            # instead of a full file-sized heap copy; keep the result as bytes
+            # because the request body is spliced together from byte fragments
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return pybase64.b64encode(mm)
     except Exception as e:
         print(f"Error reading image {image_path}: {str(e)}")
         return None
 
 def generate_virtual_tryon(person_image_path, garment_image_path, garment_class, styling_cues=None, image_stitching=True):
     """Generate virtual try-on using Bedrock Nova Canvas"""
-    bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
+    bedrock = get_bedrock_client()
     
-    # Encode images
-    person_image = encode_image(person_image_path)
-    garment_image = encode_image(garment_image_path)
+    # Encode images in parallel - the two encodes are independent and the
+    # base64 C encoder releases the GIL, so threads overlap the work
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        person_image, garment_image = executor.map(encode_image, [person_image_path, garment_image_path])
     
     if not person_image or not garment_image:
         return None
     
-    body = {
-        "taskType": "VIRTUAL_TRY_ON",
-        "virtualTryOnParams": {
-            "sourceImage": person_image,
-            "referenceImage": garment_image,
-            "maskType": "GARMENT",
-            "garmentBasedMask": {"garmentClass": garment_class},
-            "mergeStyle" : "DETAILED"
-        },
-        "imageGenerationConfig": {
-            "numberOfImages": 1,
-            #"seed": 12 # default seed is 12
-            "quality": "standard"   # standard or premium
-        }
-    }
-
-    body_json = json.dumps(body, indent = 2)
+    # Splice the pre-encoded images straight into a hand-built JSON body so
+    # the multi-MB base64 strings never take a dict + json.dumps round-trip
+    body_json = (
+        b'{"taskType":"VIRTUAL_TRY_ON",'
+        b'"virtualTryOnParams":{'
+        b'"sourceImage":"' + person_image + b'",'
+        b'"referenceImage":"' + garment_image + b'",'
+        b'"maskType":"GARMENT",'
+        b'"garmentBasedMask":{"garmentClass":' + json.dumps(garment_class).encode('utf-8') + b'},'
+        b'"mergeStyle":"DETAILED"},'
+        b'"imageGenerationConfig":{'
+        b'"numberOfImages":1,'
+        #b'"seed":12,' # default seed is 12
+        b'"quality":"standard"}}'   # standard or premium
+    )
     try:
         response = bedrock.invoke_model(
             modelId='amazon.nova-canvas-v1:0',
@@ -97,37 +138,51 @@ def generate_virtual_tryon(person_image_path, garment_image_path, garment_class,
             contentType='application/json'
         )
         
-        response_body = json.loads(response['body'].read())
-        print(len(response_body['images']))
-        if 'images' in response_body and len(response_body['images']) > 0:
-            return response_body['images'][0]
-        else:
-            print("No image generated in response")
-            return None
-            
+        # Parse the streaming body incrementally and stop at the first image -
+        # json.loads(read()) would buffer the multi-MB response and then copy
+        # the base64 string again into a dict
+        for image in ijson.items(response['body'], 'images.item'):
+            return image
+
+        print("No image generated in response")
+        return None
+
     except Exception as e:
         print(f"Error generating virtual try-on: {str(e)}")
         return None
 
+def decode_base64_to_file(data, fileobj, chunk_size=65536):
+    """Decode a base64 payload to a file in chunks so the decoded bytes
+    never fully materialize in memory (chunk size is a multiple of 4, so
+    each slice is a self-contained base64 unit)"""
+    # Pre-allocate the exact decoded size (derivable from the base64 length
+    # and padding) so the filesystem lays the file out in contiguous extents
+    # instead of growing it write by write; not available on macOS
+    if hasattr(os, 'posix_fallocate'):
+        padding = data.count('=' if isinstance(data, str) else b'=', len(data) - 2)
+        decoded_size = (len(data) * 3) // 4 - padding
+        if decoded_size > 0:
+            os.posix_fallocate(fileobj.fileno(), 0, decoded_size)
+
+    for start in range(0, len(data), chunk_size):
+        fileobj.write(binascii.a2b_base64(data[start:start + chunk_size]))
+
 def save_and_open_image(image_data):
     """Save image to file and open it"""
     try:
-        # Decode base64 image
-        image_bytes = base64.b64decode(image_data)
-        
         # Create filename with timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"virtual_tryon_{timestamp}.png"
         filepath = os.path.join(os.getcwd(), filename)
-        
-        # Save image
+
+        # Stream-decode the base64 image straight to disk
         with open(filepath, 'wb') as f:
-            f.write(image_bytes)
-        
+            decode_base64_to_file(image_data, f)
+
         print(f"\nImage saved as: {filename}")
         
         # Open image (macOS)
-        subprocess.run(['open', filepath])
+        subprocess.Popen(['open', filepath], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, close_fds=True)
         
         return filepath
         
@@ -135,22 +190,27 @@ def save_and_open_image(image_data):
         print(f"Error saving/opening image: {str(e)}")
         return None
 
-def generate_video(image_path, prompt, s3_destination_bucket, model_id=DEFAULT_MODEL_ID):
+def generate_video(image_path, prompt, s3_destination_bucket, model_id=DEFAULT_MODEL_ID, image_base64=None):
     """
     Generate a video from an input image and prompt using async invocation.
-    
+
     Args:
         image_path (str): Path to the input image
         prompt (str): Text prompt describing the desired video
         s3_filepath (str): S3 bucket URI where the video will be stored
-    """    
+        image_base64 (str): Optional pre-encoded image; Bedrock already
+            returned the try-on PNG as base64, so passing it here skips
+            re-reading and re-encoding the saved file
+    """
     # Initialize bedrock client
-    bedrock_runtime = boto3.client('bedrock-runtime', region_name='us-east-1')
-    
-    # Load the input image as a Base64 string
-    with open(image_path, "rb") as f:
-        input_image_bytes = f.read()
-        input_image_base64 = base64.b64encode(input_image_bytes).decode("utf-8")
+    bedrock_runtime = get_bedrock_client()
+
+    # Load the input image as a Base64 string (unless already provided)
+    if image_base64 is None:
+        with open(image_path, "rb") as f:
+            input_image_base64 = pybase64.b64encode(f.read()).decode("utf-8")
+    else:
+        input_image_base64 = image_base64
 
     model_input = {
         "taskType": "TEXT_VIDEO",
@@ -200,22 +260,19 @@ def generate_video(image_path, prompt, s3_destination_bucket, model_id=DEFAULT_M
 def save_video(video_data):
     """Save video to file and open it"""
     try:
-        # Decode base64 video
-        video_bytes = base64.b64decode(video_data)
-        
         # Create filename with timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"virtual_tryon_video_{timestamp}.mp4"
         filepath = os.path.join(os.getcwd(), filename)
-        
-        # Save video
+
+        # Stream-decode the base64 video straight to disk
         with open(filepath, 'wb') as f:
-            f.write(video_bytes)
-            
+            decode_base64_to_file(video_data, f)
+
         print(f"\nVideo saved as: {filename}")
         
         # Open video (macOS)
-        subprocess.run(['open', filepath])
+        subprocess.Popen(['open', filepath], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, close_fds=True)
         
         return filepath
         
@@ -225,32 +282,29 @@ def save_video(video_data):
 
 def check_and_download_video(s3_bucket, job_no):
     """Check if video exists in S3 and download when ready"""
-    s3_client = boto3.client('s3')
+    s3_client = get_s3_client()
     bucket_name = s3_bucket.replace('s3://', '')
     key = f"{job_no}/output.mp4"
     
     print("\nChecking for completed video...")
-    while True:
-        try:
-            # Check if file exists
-            s3_client.head_object(Bucket=bucket_name, Key=key)
-            
-            # File exists, download it
-            print("✅ Video found! Downloading...")
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            local_filename = f"virtual_tryon_video_{timestamp}.mp4"
-            
-            s3_client.download_file(bucket_name, key, local_filename)
-            print(f"📥 Video downloaded as: {local_filename}")
-            return local_filename
-            
-        except s3_client.exceptions.ClientError as e:
-            if e.response['Error']['Code'] == '404':
-                print("⏳ Video not ready yet, checking again in 10 seconds...")
-                time.sleep(10)
-            else:
-                print(f"❌ Error checking/downloading video: {str(e)}")
-                return None                    
+    try:
+        # Let the SDK's object_exists waiter poll for us instead of a
+        # hand-rolled HEAD-every-10s loop (every 5 seconds, up to 10 minutes)
+        waiter = s3_client.get_waiter('object_exists')
+        waiter.wait(Bucket=bucket_name, Key=key, WaiterConfig={'Delay': 5, 'MaxAttempts': 120})
+
+        # File exists, download it
+        print("✅ Video found! Downloading...")
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        local_filename = f"virtual_tryon_video_{timestamp}.mp4"
+
+        s3_client.download_file(bucket_name, key, local_filename, Config=TRANSFER_CONFIG)
+        print(f"📥 Video downloaded as: {local_filename}")
+        return local_filename
+
+    except Exception as e:
+        print(f"❌ Error checking/downloading video: {str(e)}")
+        return None
 
 
 def main():
@@ -281,11 +335,12 @@ def main():
     # Generate virtual try-on
     image_data = generate_virtual_tryon(person_image, garment_image, garment_class)
     
+    save_future = None
     if image_data:
         print("✅ Virtual try-on generated successfully!")
-        filepath = save_and_open_image(image_data)
-        if filepath:
-            print(f"🖼️  Image opened for viewing! {filepath}")
+        # Save + open on a background thread so the disk I/O and viewer
+        # launch hide behind the prompts below
+        save_future = ThreadPoolExecutor(max_workers=1).submit(save_and_open_image, image_data)
     else:
         print("❌ Failed to generate virtual try-on")
     #filepath = "./virtual_tryon_20250712_150622.png"
@@ -293,28 +348,31 @@ def main():
     do_video = input("Do you want to create a video from this image? (Y/N)").strip()
     if do_video.lower() in ('y', 'yes', 'ok'):
         prompt = input("Enter a prompt describing the video motion you want: ").strip()
-        # Select S3 bucket to use
-        bucket_list = list_s3_buckets()
-        if not bucket_list:
+        # Select S3 bucket to use - print each bucket as it streams in and
+        # keep just the filepaths for the selection below
+        bucket_paths = []
+        for ordinal, s3_filepath in iter_s3_buckets():
+            print(f"{ordinal}:\t{s3_filepath}")
+            bucket_paths.append(s3_filepath)
+
+        if not bucket_paths:
             print("No S3 buckets found!")
             return
-            
-        for bucket in bucket_list:
-            print(f"{bucket['ordinal']}:\t{bucket['s3_filepath']}")
-        
+
         while True:
             try:
                 selected_ordinal = input("Enter the number of the S3 bucket you want to use: ").strip()
                 selected_index = int(selected_ordinal) - 1
-                if 0 <= selected_index < len(bucket_list):
-                    selected_s3_filepath = bucket_list[selected_index]['s3_filepath']
+                if 0 <= selected_index < len(bucket_paths):
+                    selected_s3_filepath = bucket_paths[selected_index]
                     break
                 else:
-                    print(f"Invalid choice. Please enter a number between 1 and {len(bucket_list)}.")
+                    print(f"Invalid choice. Please enter a number between 1 and {len(bucket_paths)}.")
             except ValueError:
                 print("Invalid input. Please enter a valid number.")
         print("Generating video...")
-        invocation_arn = generate_video(filepath, prompt, selected_s3_filepath)
+        filepath = save_future.result() if save_future else None
+        invocation_arn = generate_video(filepath, prompt, selected_s3_filepath, image_base64=image_data)
         if invocation_arn:
             print("✅ Video generation job submitted successfully!")
             print(f"📋 Job ARN: {invocation_arn}")
@@ -326,9 +384,13 @@ def main():
             print(f"🔢 Job number: {job_no}")
             video_filename = check_and_download_video(selected_s3_filepath, job_no)
             # Open video
-            subprocess.run(['open', video_filename])
+            subprocess.Popen(['open', video_filename], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, close_fds=True)
         else:
-            print("❌ Failed to start video generation")   
+            print("❌ Failed to start video generation")
+    elif save_future:
+        filepath = save_future.result()
+        if filepath:
+            print(f"🖼️  Image opened for viewing! {filepath}")
 
 
 if __name__ == "__main__":
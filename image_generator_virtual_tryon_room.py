@@ -1,53 +1,91 @@
 #!/usr/bin/env python3
 import boto3
+from botocore.config import Config
 import json
-import base64
+import ijson
+import pybase64
+import mmap
 import os
 import subprocess
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import time
 
 # Constants
 NUMBER_OF_IMAGES = 3
 
+# Shared client config - larger connection pool and standard retries so
+# repeat calls reuse warm TLS connections
+BOTO_CONFIG = Config(
+    max_pool_connections=50,
+    tcp_keepalive=True,
+    retries={'mode': 'standard', 'max_attempts': 3}
+)
+
+# Shared session - caches the resolved credential chain (env -> config
+# -> instance metadata) so building clients doesn't repeat the lookups
+_SESSION = boto3.session.Session(region_name='us-east-1')
+
+# Cached boto3 client - building a client on every call pays credential
+# resolution and TLS handshake costs, so create it once and reuse it
+_BEDROCK_CLIENT = None
+
+def get_bedrock_client():
+    """Return a shared bedrock-runtime client, creating it on first use"""
+    global _BEDROCK_CLIENT
+    if _BEDROCK_CLIENT is None:
+        _BEDROCK_CLIENT = _SESSION.client('bedrock-runtime', config=BOTO_CONFIG)
+    return _BEDROCK_CLIENT
+
 def encode_image(image_path):
-    """Encode image file to base64"""
+    """Encode image file to base64 (returned as ASCII bytes)"""
     try:
         with open(image_path, 'rb') as f:
-            return base64.b64encode(f.read()).decode('utf-8')
+            # mmap the file so the encoder reads straight from the page cache
+            # instead of a full file-sized heap copy; keep the result as bytes
+            # because the request body is spliced together from byte fragments
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return pybase64.b64encode(mm)
     except Exception as e:
         print(f"Error reading image {image_path}: {str(e)}")
         return None
 
+@lru_cache(maxsize=32)
+def encode_image_cached(image_path, mtime):
+    """Encode image file to base64, cached by (path, mtime) so iterative
+    regenerations of the same room/furniture don't re-read and re-encode"""
+    return encode_image(image_path)
+
 def generate_virtual_tryon(room_image_path, furniture_image_path, prompt_text):
     """Generate virtual try-on using Bedrock Nova Canvas"""
-    bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
+    bedrock = get_bedrock_client()
     
-    # Encode images
-    room_image = encode_image(room_image_path)
-    furniture_image = encode_image(furniture_image_path)
+    # Encode images in parallel - the two encodes are independent and the
+    # base64 C encoder releases the GIL, so threads overlap the work
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        room_image, furniture_image = executor.map(
+            lambda path: encode_image_cached(path, os.path.getmtime(path)),
+            [room_image_path, furniture_image_path])
     
     if not room_image or not furniture_image:
         return None
     
-    body = {
-        "taskType": "VIRTUAL_TRY_ON",
-        "virtualTryOnParams": {
-            "sourceImage": room_image,
-            "referenceImage": furniture_image,
-            "maskType": "PROMPT",
-            "promptBasedMask":{
-                "maskShape": "DEFAULT",
-                "maskPrompt": prompt_text,
-            },
-        },
-        "imageGenerationConfig": {
-            "numberOfImages": NUMBER_OF_IMAGES, # number of images to generate
-            #"seed": 12, # Initial noise setting. Default 12.
-            "quality": "standard" # standard or premium
-        }
-    }
-
-    body_json = json.dumps(body, indent = 2)
+    # Splice the pre-encoded images straight into a hand-built JSON body so
+    # the multi-MB base64 strings never take a dict + json.dumps round-trip
+    body_json = (
+        b'{"taskType":"VIRTUAL_TRY_ON",'
+        b'"virtualTryOnParams":{'
+        b'"sourceImage":"' + room_image + b'",'
+        b'"referenceImage":"' + furniture_image + b'",'
+        b'"maskType":"PROMPT",'
+        b'"promptBasedMask":{'
+        b'"maskShape":"DEFAULT",'
+        b'"maskPrompt":' + json.dumps(prompt_text).encode('utf-8') + b'}},'
+        b'"imageGenerationConfig":{'
+        b'"numberOfImages":' + str(NUMBER_OF_IMAGES).encode('utf-8') + b',' # number of images to generate
+        #b'"seed":12,' # Initial noise setting. Default 12.
+        b'"quality":"standard"}}' # standard or premium
+    )
     try:
         response = bedrock.invoke_model(
             modelId='amazon.nova-canvas-v1:0',
@@ -56,46 +94,59 @@ def generate_virtual_tryon(room_image_path, furniture_image_path, prompt_text):
             contentType='application/json'
         )
         
-        response_body = json.loads(response['body'].read())
-        print(len(response_body['images']))
-        if 'images' in response_body and len(response_body['images']) > 0:
-            return response_body['images']
+        # Parse the streaming body incrementally - json.loads(read()) would
+        # buffer the full multi-image response and then copy every base64
+        # string again into a dict
+        images = list(ijson.items(response['body'], 'images.item'))
+        print(len(images))
+        if images:
+            return images
         else:
             print("No image generated in response")
             return None
-            
+
     except Exception as e:
         print(f"Error generating virtual try-on: {str(e)}")
         return None
 
+def _decode_and_save_one(indexed_image, timestamp):
+    """Decode one base64 image and save + open it (thread worker)"""
+    index, image_data = indexed_image
+    try:
+        # Decode base64 image
+        image_bytes = pybase64.b64decode(image_data)
+
+        # Create filename from the shared batch timestamp
+        filename = f"virtual_tryon_{timestamp}_{index}.png"
+        filepath = os.path.join(os.getcwd(), filename)
+
+        # Save image, pre-allocating the full size so the filesystem lays the
+        # file out in contiguous extents (posix_fallocate is Linux-only)
+        with open(filepath, 'wb') as f:
+            if hasattr(os, 'posix_fallocate') and image_bytes:
+                os.posix_fallocate(f.fileno(), 0, len(image_bytes))
+            f.write(image_bytes)
+
+        print(f"\nImage saved as: {filename}")
+
+        # Open image (macOS)
+        subprocess.Popen(['open', filepath], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, close_fds=True)
+
+        print(f"🖼️  Image opened for viewing: {filepath}")
+
+    except Exception as e:
+        print(f"Error saving/opening image: {str(e)}")
+
 def save_and_open_images(images_data):
-    """Save image to file and open it"""
-
-    for index, image_data in enumerate(images_data):
-        try:
-            # Decode base64 image
-            image_bytes = base64.b64decode(image_data)
-            
-            # Create filename with timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"virtual_tryon_{timestamp}_{index}.png"
-            filepath = os.path.join(os.getcwd(), filename)
-            
-            # Save image
-            with open(filepath, 'wb') as f:
-                f.write(image_bytes)
-            
-            print(f"\nImage saved as: {filename}")
-            
-            # Open image (macOS)
-            subprocess.run(['open', filepath])
-            
-            if filepath:
-                print(f"🖼️  Image opened for viewing: {filepath}")
-            
-        except Exception as e:
-            print(f"Error saving/opening image: {str(e)}")
-            return None
+    """Save images to files and open them"""
+    # One timestamp for the whole batch, with a monotonic suffix so batches
+    # saved within the same second don't race each other over filenames
+    timestamp = time.strftime("%Y%m%d_%H%M%S") + f"_{time.monotonic_ns() & 0xffff:04x}"
+
+    # The per-image decodes and writes are independent, and pybase64 releases
+    # the GIL during the C decode, so run them in parallel
+    with ThreadPoolExecutor(max_workers=len(images_data)) as executor:
+        list(executor.map(lambda item: _decode_and_save_one(item, timestamp), enumerate(images_data)))
 
 def main():
     print("👗 Bedrock Nova Canvas Virtual Try-On")
@@ -1,11 +1,36 @@
 #!/usr/bin/env python3
 import boto3
+from botocore.config import Config
 import json
-import base64
+import orjson
+import binascii
 import os
 import subprocess
 from datetime import datetime
 
+# Shared client config - larger connection pool and standard retries so
+# repeat calls reuse warm TLS connections
+BOTO_CONFIG = Config(
+    max_pool_connections=50,
+    tcp_keepalive=True,
+    retries={'mode': 'standard', 'max_attempts': 3}
+)
+
+# Shared session - caches the resolved credential chain (env -> config
+# -> instance metadata) so building clients doesn't repeat the lookups
+_SESSION = boto3.session.Session(region_name='us-east-1')
+
+# Cached boto3 client - building a client on every call pays credential
+# resolution and TLS handshake costs, so create it once and reuse it
+_BEDROCK_CLIENT = None
+
+def get_bedrock_client():
+    """Return a shared bedrock-runtime client, creating it on first use"""
+    global _BEDROCK_CLIENT
+    if _BEDROCK_CLIENT is None:
+        _BEDROCK_CLIENT = _SESSION.client('bedrock-runtime', config=BOTO_CONFIG)
+    return _BEDROCK_CLIENT
+
 def get_visual_style():
     """Display menu and get user's visual style choice"""
     styles = {
@@ -37,7 +62,7 @@ def get_visual_style():
 
 def generate_image(prompt, style):
     """Generate image using Bedrock Nova Canvas"""
-    bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
+    bedrock = get_bedrock_client()
     
     body = {
         "taskType": "TEXT_IMAGE",
@@ -64,11 +89,13 @@ def generate_image(prompt, style):
         print(body)
         response = bedrock.invoke_model(
             modelId='amazon.nova-canvas-v1:0',
-            body=json.dumps(body),
+            body=json.dumps(body, separators=(',', ':')),
             contentType='application/json'
         )
         
-        response_body = json.loads(response['body'].read())
+        # orjson's C decoder is 2-3x faster than stdlib json on the large
+        # base64-bearing response bodies
+        response_body = orjson.loads(response['body'].read())
         
         if 'images' in response_body and len(response_body['images']) > 0:
             return response_body['images'][0]
@@ -80,25 +107,38 @@ def generate_image(prompt, style):
         print(f"Error generating image: {str(e)}")
         return None
 
+def decode_base64_to_file(data, fileobj, chunk_size=65536):
+    """Decode a base64 payload to a file in chunks so the decoded bytes
+    never fully materialize in memory (chunk size is a multiple of 4, so
+    each slice is a self-contained base64 unit)"""
+    # Pre-allocate the exact decoded size (derivable from the base64 length
+    # and padding) so the filesystem lays the file out in contiguous extents
+    # instead of growing it write by write; not available on macOS
+    if hasattr(os, 'posix_fallocate'):
+        padding = data.count('=' if isinstance(data, str) else b'=', len(data) - 2)
+        decoded_size = (len(data) * 3) // 4 - padding
+        if decoded_size > 0:
+            os.posix_fallocate(fileobj.fileno(), 0, decoded_size)
+
+    for start in range(0, len(data), chunk_size):
+        fileobj.write(binascii.a2b_base64(data[start:start + chunk_size]))
+
 def save_and_open_image(image_data):
     """Save image to file and open it"""
     try:
-        # Decode base64 image
-        image_bytes = base64.b64decode(image_data)
-        
         # Create filename with timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"generated_image_{timestamp}.png"
         filepath = os.path.join(os.getcwd(), filename)
-        
-        # Save image
+
+        # Stream-decode the base64 image straight to disk
         with open(filepath, 'wb') as f:
-            f.write(image_bytes)
-        
+            decode_base64_to_file(image_data, f)
+
         print(f"\nImage saved as: {filename}")
         
         # Open image (macOS)
-        subprocess.run(['open', filepath])
+        subprocess.Popen(['open', filepath], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, close_fds=True)
         
         return filepath
         